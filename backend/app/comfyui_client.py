@@ -3,31 +3,34 @@ ComfyUI API client for queue monitoring.
 Polls the ComfyUI queue endpoint to detect activity.
 """
 
+import asyncio
 import httpx
 import logging
+import time
+from dataclasses import dataclass, field
 from typing import Optional, Dict, Any
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from .config import get_config
+from .config import Config, config_manager, get_config
 
 logger = logging.getLogger(__name__)
 
+# Readiness probes back off exponentially between these bounds (seconds)
+READY_PROBE_INITIAL_INTERVAL = 0.2
+READY_PROBE_MAX_INTERVAL = 5.0
 
+
+@dataclass(slots=True)
 class QueueStatus:
     """Represents the current queue status."""
 
-    def __init__(
-        self,
-        running: int = 0,
-        pending: int = 0,
-        connected: bool = False,
-        error: Optional[str] = None
-    ):
-        self.running = running
-        self.pending = pending
-        self.connected = connected
-        self.error = error
-        self.timestamp = datetime.now()
+    running: int = 0
+    pending: int = 0
+    connected: bool = False
+    error: Optional[str] = None
+    timestamp: datetime = field(default_factory=datetime.now)
+    # Serialized form, built on first use; statuses are never mutated
+    _dict: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
 
     @property
     def is_active(self) -> bool:
@@ -41,15 +44,17 @@ class QueueStatus:
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization."""
-        return {
-            "running": self.running,
-            "pending": self.pending,
-            "total_jobs": self.total_jobs,
-            "is_active": self.is_active,
-            "connected": self.connected,
-            "error": self.error,
-            "timestamp": self.timestamp.isoformat()
-        }
+        if self._dict is None:
+            self._dict = {
+                "running": self.running,
+                "pending": self.pending,
+                "total_jobs": self.total_jobs,
+                "is_active": self.is_active,
+                "connected": self.connected,
+                "error": self.error,
+                "timestamp": self.timestamp.isoformat()
+            }
+        return self._dict
 
 
 class ComfyUIClient:
@@ -57,43 +62,64 @@ class ComfyUIClient:
 
     def __init__(self):
         self._last_status: Optional[QueueStatus] = None
-        self._last_activity: datetime = datetime.now()
+        # Monotonic so idle time is immune to wall-clock jumps
+        self._last_activity: float = time.monotonic()
+        # Long-lived client so polls reuse keep-alive connections
+        self._client = httpx.AsyncClient(
+            timeout=5.0,
+            limits=httpx.Limits(max_keepalive_connections=4)
+        )
+        # Tracks whether the last probe reached ComfyUI; kept current by
+        # every queue poll and health check
+        self._ready_event = asyncio.Event()
+        self._queue_url: str = ""
+        self._health_url: str = ""
+        self.reload_config(get_config())
+        config_manager.add_listener(self.reload_config)
+
+    def reload_config(self, config: Config) -> None:
+        """Recompute the cached ComfyUI endpoint URLs."""
+        self._queue_url = f"{config.comfyui_url}/queue"
+        self._health_url = f"{config.comfyui_url}/system_stats"
+
+    async def aclose(self) -> None:
+        """Close the underlying HTTP client."""
+        await self._client.aclose()
 
     async def get_queue_status(self) -> QueueStatus:
         """Fetch current queue status from ComfyUI."""
-        config = get_config()
-        url = f"{config.comfyui_url}/queue"
-
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(url)
-                response.raise_for_status()
+            response = await self._client.get(self._queue_url)
+            response.raise_for_status()
 
-                data = response.json()
+            data = response.json()
 
-                # ComfyUI returns: {"queue_running": [...], "queue_pending": [...]}
-                running = len(data.get("queue_running", []))
-                pending = len(data.get("queue_pending", []))
+            # ComfyUI returns: {"queue_running": [...], "queue_pending": [...]}
+            running = len(data.get("queue_running", []))
+            pending = len(data.get("queue_pending", []))
 
-                status = QueueStatus(
-                    running=running,
-                    pending=pending,
-                    connected=True
-                )
+            status = QueueStatus(
+                running=running,
+                pending=pending,
+                connected=True
+            )
 
-                # Update last activity if there are jobs
-                if status.is_active:
-                    self._last_activity = datetime.now()
+            # Update last activity if there are jobs
+            if status.is_active:
+                self._last_activity = time.monotonic()
 
-                self._last_status = status
-                return status
+            self._last_status = status
+            self._ready_event.set()
+            return status
 
         except httpx.ConnectError:
             logger.debug("Cannot connect to ComfyUI - container may be stopped")
+            self._ready_event.clear()
             return QueueStatus(connected=False, error="Connection refused")
 
         except httpx.TimeoutException:
             logger.warning("Timeout connecting to ComfyUI")
+            self._ready_event.clear()
             return QueueStatus(connected=False, error="Connection timeout")
 
         except httpx.HTTPStatusError as e:
@@ -102,44 +128,57 @@ class ComfyUIClient:
 
         except Exception as e:
             logger.error(f"Unexpected error polling ComfyUI: {e}")
+            self._ready_event.clear()
             return QueueStatus(connected=False, error=str(e))
 
     async def is_healthy(self) -> bool:
-        """Check if ComfyUI is responding."""
-        config = get_config()
-        url = f"{config.comfyui_url}/system_stats"
-
+        """Check if ComfyUI is responding, recording the result in ready_event."""
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(url)
-                return response.status_code == 200
+            response = await self._client.get(self._health_url)
+            healthy = response.status_code == 200
         except Exception:
-            return False
+            healthy = False
+
+        if healthy:
+            self._ready_event.set()
+        else:
+            self._ready_event.clear()
+        return healthy
 
     async def wait_for_ready(self, timeout_seconds: int = 120) -> bool:
-        """Wait for ComfyUI to become ready after starting."""
-        import asyncio
+        """Wait for ComfyUI to become ready after starting.
 
-        start_time = datetime.now()
-        check_interval = 2  # seconds
+        Probes until healthy; other waiters can await ready_event instead,
+        which every successful probe sets.
+        """
+        deadline = time.monotonic() + timeout_seconds
+        # Probe quickly at first for fast starts, then back off so a long
+        # startup costs a handful of connection attempts rather than dozens
+        check_interval = READY_PROBE_INITIAL_INTERVAL
 
-        while (datetime.now() - start_time).total_seconds() < timeout_seconds:
+        while (remaining := deadline - time.monotonic()) > 0:
             if await self.is_healthy():
                 logger.info("ComfyUI is ready")
                 return True
-            await asyncio.sleep(check_interval)
+            await asyncio.sleep(min(check_interval, remaining))
+            check_interval = min(check_interval * 2, READY_PROBE_MAX_INTERVAL)
 
         logger.warning(f"ComfyUI did not become ready within {timeout_seconds}s")
         return False
 
     def update_activity(self) -> None:
         """Manually update last activity timestamp (e.g., on proxy request)."""
-        self._last_activity = datetime.now()
+        self._last_activity = time.monotonic()
 
     @property
     def last_activity(self) -> datetime:
-        """Get timestamp of last detected activity."""
-        return self._last_activity
+        """Get wall-clock timestamp of last detected activity."""
+        return datetime.now() - timedelta(seconds=self.seconds_since_activity())
+
+    @property
+    def ready_event(self) -> asyncio.Event:
+        """Event set while ComfyUI is answering requests."""
+        return self._ready_event
 
     @property
     def last_status(self) -> Optional[QueueStatus]:
@@ -148,7 +187,7 @@ class ComfyUIClient:
 
     def seconds_since_activity(self) -> float:
         """Get seconds since last activity."""
-        return (datetime.now() - self._last_activity).total_seconds()
+        return time.monotonic() - self._last_activity
 
 
 # Global ComfyUI client instance
@@ -5,13 +5,21 @@ Handles environment variables and persistent config storage.
 
 import os
 import json
+import orjson
+from functools import cached_property
 from pathlib import Path
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ConfigDict
+from typing import Callable, List, Optional
 
 
 class Config(BaseModel):
-    """Application configuration."""
+    """Application configuration.
+
+    Instances are immutable; updates replace the whole object, which lets
+    derived values such as URLs be computed once per instance.
+    """
+
+    model_config = ConfigDict(frozen=True)
 
     # Docker settings
     container_name: str = "comfyui"
@@ -34,12 +42,12 @@ class Config(BaseModel):
     manager_port: int = 8080
     proxy_port: int = 8188
 
-    @property
+    @cached_property
     def comfyui_url(self) -> str:
         """Internal URL for backend to connect to ComfyUI."""
         return f"http://{self.comfyui_host}:{self.comfyui_port}"
 
-    @property
+    @cached_property
     def comfyui_browser_url(self) -> str:
         """URL for browser to access ComfyUI directly."""
         if self.comfyui_external_url:
@@ -47,6 +55,27 @@ class Config(BaseModel):
         return f"http://{self.comfyui_host}:{self.comfyui_port}"
 
 
+def _parse_bool(value: str) -> bool:
+    """Parse a boolean environment variable."""
+    return value.lower() == "true"
+
+
+# Environment variable -> (config field, converter)
+ENV_MAPPINGS = {
+    "COMFYUI_CONTAINER_NAME": ("container_name", str),
+    "DOCKER_SOCKET": ("docker_socket", str),
+    "COMFYUI_HOST": ("comfyui_host", str),
+    "COMFYUI_PORT": ("comfyui_port", int),
+    "COMFYUI_EXTERNAL_URL": ("comfyui_external_url", str),
+    "IDLE_TIMEOUT_MINUTES": ("idle_timeout_minutes", int),
+    "POLL_INTERVAL_SECONDS": ("poll_interval_seconds", int),
+    "AUTO_START_ENABLED": ("auto_start_enabled", _parse_bool),
+    "STARTUP_TIMEOUT_SECONDS": ("startup_timeout_seconds", int),
+    "MANAGER_PORT": ("manager_port", int),
+    "PROXY_PORT": ("proxy_port", int),
+}
+
+
 class ConfigManager:
     """Manages configuration loading, saving, and updates."""
 
@@ -56,6 +85,17 @@ class ConfigManager:
             "/app/data/config.json"
         ))
         self._config: Optional[Config] = None
+        self._listeners: List[Callable[[Config], None]] = []
+        self._saved_bytes: Optional[bytes] = None
+
+    def add_listener(self, callback: Callable[[Config], None]) -> None:
+        """Register a callback invoked whenever the configuration changes."""
+        self._listeners.append(callback)
+
+    def _notify_listeners(self) -> None:
+        """Notify registered listeners of the current configuration."""
+        for callback in self._listeners:
+            callback(self._config)
 
     def load(self) -> Config:
         """Load configuration from environment and file."""
@@ -71,42 +111,35 @@ class ConfigManager:
                 pass
 
         # Override with environment variables
-        env_mappings = {
-            "COMFYUI_CONTAINER_NAME": "container_name",
-            "DOCKER_SOCKET": "docker_socket",
-            "COMFYUI_HOST": "comfyui_host",
-            "COMFYUI_PORT": ("comfyui_port", int),
-            "COMFYUI_EXTERNAL_URL": "comfyui_external_url",
-            "IDLE_TIMEOUT_MINUTES": ("idle_timeout_minutes", int),
-            "POLL_INTERVAL_SECONDS": ("poll_interval_seconds", int),
-            "AUTO_START_ENABLED": ("auto_start_enabled", lambda x: x.lower() == "true"),
-            "STARTUP_TIMEOUT_SECONDS": ("startup_timeout_seconds", int),
-            "MANAGER_PORT": ("manager_port", int),
-            "PROXY_PORT": ("proxy_port", int),
-        }
-
-        for env_var, mapping in env_mappings.items():
+        for env_var, (key, converter) in ENV_MAPPINGS.items():
             value = os.getenv(env_var)
             if value is not None:
-                if isinstance(mapping, tuple):
-                    key, converter = mapping
-                    config_dict[key] = converter(value)
-                else:
-                    config_dict[mapping] = value
+                config_dict[key] = converter(value)
 
         self._config = Config(**config_dict)
+        self._notify_listeners()
         return self._config
 
     def save(self) -> None:
-        """Save current configuration to file."""
+        """Save current configuration to file.
+
+        Skips the write when nothing changed since the last save, and writes
+        through a temporary file so a crash never leaves a truncated config.
+        """
         if self._config is None:
             return
 
+        data = orjson.dumps(self._config.model_dump(), option=orjson.OPT_INDENT_2)
+        if data == self._saved_bytes:
+            return
+
         # Ensure directory exists
         self.config_path.parent.mkdir(parents=True, exist_ok=True)
 
-        with open(self.config_path, "w") as f:
-            json.dump(self._config.model_dump(), f, indent=2)
+        tmp_path = self.config_path.with_suffix(".tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, self.config_path)
+        self._saved_bytes = data
 
     def update(self, **kwargs) -> Config:
         """Update configuration with new values."""
@@ -117,6 +150,7 @@ class ConfigManager:
         current_dict.update(kwargs)
         self._config = Config(**current_dict)
         self.save()
+        self._notify_listeners()
         return self._config
 
     @property
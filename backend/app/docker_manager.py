@@ -3,13 +3,16 @@ Docker container management for ComfyUI.
 Handles starting, stopping, and monitoring the ComfyUI container.
 """
 
+import asyncio
 import docker
 import logging
-from typing import Optional, Dict, Any, List
+import time
+from collections import deque
+from typing import Optional, Dict, Any, List, AsyncIterator, Iterable, Iterator, Tuple, Callable
 from datetime import datetime
 from enum import Enum
 
-from .config import get_config
+from .config import Config, config_manager, get_config
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +27,53 @@ class ContainerState(str, Enum):
     NOT_FOUND = "not_found"
 
 
+# Docker event actions that change whether the container is running
+WATCHED_EVENTS = ("start", "die", "stop", "kill")
+
+# Connections kept open to the Docker daemon socket
+DOCKER_POOL_SIZE = 32
+
+# Seconds a looked-up container and its status are reused before asking
+# the Docker daemon again. Start/stop and container events invalidate early.
+CONTAINER_CACHE_TTL = 5.0
+
+# Log lines kept in memory while following a running container's logs
+LOG_BUFFER_SIZE = 1000
+
+
+def _iter_log_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Split a docker log byte stream into decoded lines."""
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        *complete, pending = pending.split(b"\n")
+        for line in complete:
+            yield line.decode("utf-8", "replace").rstrip()
+    if pending.strip():
+        yield pending.decode("utf-8", "replace").rstrip()
+
+
+class _LogFollower:
+    """One log-following session with its own stream and buffer.
+
+    Stopping a session never touches another, so a follower still opening
+    its stream cannot leak into or clear the state of its replacement.
+    """
+
+    __slots__ = ("buffer", "stream", "stopped")
+
+    def __init__(self):
+        self.buffer: deque = deque(maxlen=LOG_BUFFER_SIZE)
+        self.stream = None
+        self.stopped: bool = False
+
+    def stop(self) -> None:
+        """Mark the session stopped and close its stream if already open."""
+        self.stopped = True
+        if self.stream is not None:
+            self.stream.close()
+
+
 class DockerManager:
     """Manages Docker container operations for ComfyUI."""
 
@@ -31,35 +81,205 @@ class DockerManager:
         self._client: Optional[docker.DockerClient] = None
         self._state: ContainerState = ContainerState.STOPPED
         self._state_changed_at: datetime = datetime.now()
+        # Held for the whole of a start or stop so the two never interleave
+        self._op_lock = asyncio.Lock()
+        self._container_cache: Optional[Tuple[docker.models.containers.Container, float]] = None
+        self._status_cache: Optional[Tuple[Dict[str, Any], float]] = None
+        self._status_inflight: Optional[asyncio.Future] = None
+        self._status_inflight_generation: int = 0
+        # Bumped by every invalidation and state transition; inspections
+        # begun under an older generation are discarded instead of cached
+        self._generation: int = 0
+        self._state_listeners: List[Callable[[ContainerState], None]] = []
+        # Recent log lines, fed by a follower while the container runs
+        self._log_follower: Optional[_LogFollower] = None
+        self._log_task: Optional[asyncio.Task] = None
+        # Settings identifying the container, to detect when it changes
+        self._target: Optional[Tuple[str, str]] = None
+        config_manager.add_listener(self._on_config_change)
 
     @property
     def client(self) -> docker.DockerClient:
         """Get or create Docker client."""
         if self._client is None:
             config = get_config()
-            self._client = docker.DockerClient(base_url=f"unix://{config.docker_socket}")
+            # Larger keep-alive pool: the proxy, monitor, event watcher and
+            # WebSocket loop all talk to the daemon concurrently from threads
+            self._client = docker.DockerClient(
+                base_url=f"unix://{config.docker_socket}",
+                max_pool_size=DOCKER_POOL_SIZE
+            )
         return self._client
 
+    def add_state_listener(self, callback: Callable[[ContainerState], None]) -> None:
+        """Register a callback invoked when start/stop or a Docker event changes the state."""
+        self._state_listeners.append(callback)
+
+    def _set_state(self, state: ContainerState) -> None:
+        """Record a state transition and notify listeners."""
+        self._state = state
+        self._state_changed_at = datetime.now()
+        self._generation += 1
+        for callback in self._state_listeners:
+            callback(state)
+
+    def _on_config_change(self, config: Config) -> None:
+        """Drop cached lookups when the config points at a different container."""
+        target = (config.container_name, config.docker_socket)
+        if target == self._target:
+            return
+        if self._target is not None:
+            self.invalidate_cache()
+            self.stop_log_follower()
+        self._target = target
+
+    def invalidate_cache(self) -> None:
+        """Forget the cached container handle and status."""
+        self._generation += 1
+        self._container_cache = None
+        self._status_cache = None
+
     def _get_container(self) -> Optional[docker.models.containers.Container]:
-        """Get the ComfyUI container by name."""
+        """Get the ComfyUI container by name, reusing a recent lookup."""
+        if self._container_cache is not None:
+            container, fetched_at = self._container_cache
+            if time.monotonic() - fetched_at < CONTAINER_CACHE_TTL:
+                return container
+
         config = get_config()
+        generation = self._generation
         try:
-            return self.client.containers.get(config.container_name)
+            container = self.client.containers.get(config.container_name)
+            if generation == self._generation:
+                self._container_cache = (container, time.monotonic())
+            return container
         except docker.errors.NotFound:
             logger.warning(f"Container '{config.container_name}' not found")
+            # Not invalidate_cache(): that would discard this very lookup
+            self._container_cache = None
             return None
         except docker.errors.APIError as e:
             logger.error(f"Docker API error: {e}")
             return None
 
+    async def _aget_container(self) -> Optional[docker.models.containers.Container]:
+        """Get the container without blocking the event loop."""
+        return await asyncio.to_thread(self._get_container)
+
+    async def get_status_async(self) -> Dict[str, Any]:
+        """Get current container status without blocking the event loop.
+
+        Concurrent callers share a single in-flight Docker inspection.
+        """
+        # Fresh cache: no need for a thread hop
+        status = self._get_cached_status()
+        if status is not None:
+            return status
+
+        # A fetch begun before the last invalidation may predate a stop or
+        # start; start a new one rather than join it
+        if self._status_inflight is None or self._status_inflight_generation != self._generation:
+            self._status_inflight = asyncio.ensure_future(asyncio.to_thread(self.get_status))
+            self._status_inflight_generation = self._generation
+            self._status_inflight.add_done_callback(self._clear_status_inflight)
+
+        # Shielded so one cancelled caller does not cancel the shared fetch
+        return await asyncio.shield(self._status_inflight)
+
+    async def get_state_async(self) -> ContainerState:
+        """Get the current container state enum, refreshed via the status cache."""
+        await self.get_status_async()
+        return self._state
+
+    def _clear_status_inflight(self, future: asyncio.Future) -> None:
+        """Forget a finished in-flight status fetch."""
+        if self._status_inflight is future:
+            self._status_inflight = None
+
+    async def get_logs_async(self, tail: int = 100) -> List[str]:
+        """Get recent container logs without blocking the event loop.
+
+        While the container runs, logs are followed into an in-memory ring
+        buffer and served from there; otherwise they are fetched on demand.
+        """
+        follower = self._log_follower
+        if follower is not None and follower.buffer and self._log_task is not None and not self._log_task.done():
+            # Copy in one step: the follower thread appends concurrently
+            lines = list(follower.buffer)
+            return lines[-tail:]
+
+        if self._state is ContainerState.RUNNING:
+            self._start_log_follower()
+        return await asyncio.to_thread(self.get_logs, tail)
+
+    def _start_log_follower(self) -> None:
+        """Begin following the container's logs if not already doing so."""
+        if self._log_task is None or self._log_task.done():
+            self._log_follower = _LogFollower()
+            self._log_task = asyncio.create_task(self._run_log_follower(self._log_follower))
+
+    def stop_log_follower(self) -> None:
+        """Stop following logs; the follower thread exits once its stream closes."""
+        if self._log_follower is not None:
+            self._log_follower.stop()
+            self._log_follower = None
+        if self._log_task is not None:
+            self._log_task.cancel()
+            self._log_task = None
+
+    async def _run_log_follower(self, follower: _LogFollower) -> None:
+        """Follow the container's logs until the container stops."""
+        container = await self._aget_container()
+        if container is not None and not follower.stopped:
+            await asyncio.to_thread(self._follow_logs, container, follower)
+
+    def _follow_logs(self, container: docker.models.containers.Container, follower: _LogFollower) -> None:
+        """Read the followed log stream into the follower's buffer (runs in a thread)."""
+        try:
+            stream = container.logs(stream=True, follow=True, timestamps=True, tail=LOG_BUFFER_SIZE)
+            follower.stream = stream
+            # Stopped while the stream was opening: stop() saw no stream
+            if follower.stopped:
+                stream.close()
+                return
+            follower.buffer.extend(_iter_log_lines(stream))
+        except Exception as e:
+            logger.debug("Log stream ended: %s", e)
+
     def get_status(self) -> Dict[str, Any]:
-        """Get current container status."""
+        """Get current container status, reusing a recent result."""
+        status = self._get_cached_status()
+        if status is not None:
+            return status
+
+        # Retry if the state was invalidated or changed while inspecting, so
+        # an inspection from before a stop never reinstates "running"
+        while True:
+            generation = self._generation
+            state, status = self._fetch_status()
+            if generation == self._generation:
+                break
+
+        self._state = state
+        self._status_cache = (status, time.monotonic())
+        return status
+
+    def _get_cached_status(self) -> Optional[Dict[str, Any]]:
+        """Get the cached status if it is still within the TTL."""
+        if self._status_cache is not None:
+            status, fetched_at = self._status_cache
+            if time.monotonic() - fetched_at < CONTAINER_CACHE_TTL:
+                return status
+        return None
+
+    def _fetch_status(self) -> Tuple[ContainerState, Dict[str, Any]]:
+        """Inspect the container and build its state and status."""
         container = self._get_container()
 
         if container is None:
-            self._state = ContainerState.NOT_FOUND
-            return {
-                "state": self._state.value,
+            state = ContainerState.NOT_FOUND
+            return state, {
+                "state": state.value,
                 "container_exists": False,
                 "message": "Container not found"
             }
@@ -68,24 +288,23 @@ class DockerManager:
 
         # Map Docker status to our states
         if status == "running":
-            self._state = ContainerState.RUNNING
+            state = ContainerState.RUNNING
         elif status in ("created", "restarting"):
-            self._state = ContainerState.STARTING
+            state = ContainerState.STARTING
         elif status in ("paused", "exited", "dead"):
-            self._state = ContainerState.STOPPED
+            state = ContainerState.STOPPED
         else:
-            self._state = ContainerState.ERROR
+            state = ContainerState.ERROR
 
-        # Get container details
-        container.reload()
+        # containers.get() already returned fully inspected attrs
         attrs = container.attrs
 
         started_at = None
         if attrs.get("State", {}).get("StartedAt"):
             started_at = attrs["State"]["StartedAt"]
 
-        return {
-            "state": self._state.value,
+        return state, {
+            "state": state.value,
             "container_exists": True,
             "docker_status": status,
             "container_id": container.short_id,
@@ -96,100 +315,158 @@ class DockerManager:
 
     async def start_container(self) -> Dict[str, Any]:
         """Start the ComfyUI container."""
-        container = self._get_container()
-
-        if container is None:
-            return {
-                "success": False,
-                "error": "Container not found",
-                "state": ContainerState.NOT_FOUND.value
-            }
-
-        current_status = container.status
-        if current_status == "running":
-            return {
-                "success": True,
-                "message": "Container already running",
-                "state": ContainerState.RUNNING.value
-            }
-
-        self._state = ContainerState.STARTING
-        self._state_changed_at = datetime.now()
-
-        try:
-            logger.info(f"Starting container: {container.name}")
-            container.start()
-
-            # Wait briefly for container to start
-            container.reload()
+        # Serialize starts so concurrent callers (proxy wake-ups, manual
+        # starts) never race on the same container; later callers see it running
+        async with self._op_lock:
+            # Always act on a fresh inspection, never a cached one
+            self.invalidate_cache()
+            container = await self._aget_container()
+
+            if container is None:
+                return {
+                    "success": False,
+                    "error": "Container not found",
+                    "state": ContainerState.NOT_FOUND.value
+                }
 
-            if container.status == "running":
-                self._state = ContainerState.RUNNING
-                self._state_changed_at = datetime.now()
+            if container.attrs["State"]["Status"] == "running":
                 return {
                     "success": True,
-                    "message": "Container started successfully",
+                    "message": "Container already running",
                     "state": ContainerState.RUNNING.value
                 }
-            else:
+
+            self._set_state(ContainerState.STARTING)
+
+            try:
+                logger.info(f"Starting container: {container.name}")
+                await asyncio.to_thread(container.start)
+
+                # Wait briefly for container to start
+                await asyncio.to_thread(container.reload)
+                self.invalidate_cache()
+                docker_status = container.attrs["State"]["Status"]
+
+                if docker_status == "running":
+                    self._set_state(ContainerState.RUNNING)
+                    return {
+                        "success": True,
+                        "message": "Container started successfully",
+                        "state": ContainerState.RUNNING.value
+                    }
+                else:
+                    return {
+                        "success": True,
+                        "message": "Container start initiated",
+                        "state": ContainerState.STARTING.value
+                    }
+
+            except docker.errors.APIError as e:
+                logger.error(f"Failed to start container: {e}")
+                self._set_state(ContainerState.ERROR)
                 return {
-                    "success": True,
-                    "message": "Container start initiated",
-                    "state": ContainerState.STARTING.value
+                    "success": False,
+                    "error": str(e),
+                    "state": ContainerState.ERROR.value
                 }
 
-        except docker.errors.APIError as e:
-            logger.error(f"Failed to start container: {e}")
-            self._state = ContainerState.ERROR
-            return {
-                "success": False,
-                "error": str(e),
-                "state": ContainerState.ERROR.value
-            }
-
     async def stop_container(self) -> Dict[str, Any]:
         """Stop the ComfyUI container."""
-        container = self._get_container()
+        # Never stop while a start is in flight (or vice versa); an idle
+        # shutdown racing a wake-up would otherwise leave the state wrong
+        async with self._op_lock:
+            # Always act on a fresh inspection, never a cached one
+            self.invalidate_cache()
+            container = await self._aget_container()
+
+            if container is None:
+                return {
+                    "success": False,
+                    "error": "Container not found",
+                    "state": ContainerState.NOT_FOUND.value
+                }
 
-        if container is None:
-            return {
-                "success": False,
-                "error": "Container not found",
-                "state": ContainerState.NOT_FOUND.value
-            }
+            if container.attrs["State"]["Status"] != "running":
+                return {
+                    "success": True,
+                    "message": "Container already stopped",
+                    "state": ContainerState.STOPPED.value
+                }
 
-        current_status = container.status
-        if current_status != "running":
-            return {
-                "success": True,
-                "message": "Container already stopped",
-                "state": ContainerState.STOPPED.value
-            }
+            self._set_state(ContainerState.STOPPING)
 
-        self._state = ContainerState.STOPPING
-        self._state_changed_at = datetime.now()
+            try:
+                logger.info(f"Stopping container: {container.name}")
+                await asyncio.to_thread(container.stop, timeout=30)
+                self.invalidate_cache()
 
-        try:
-            logger.info(f"Stopping container: {container.name}")
-            container.stop(timeout=30)
+                self._set_state(ContainerState.STOPPED)
 
-            self._state = ContainerState.STOPPED
-            self._state_changed_at = datetime.now()
+                return {
+                    "success": True,
+                    "message": "Container stopped successfully",
+                    "state": ContainerState.STOPPED.value
+                }
 
-            return {
-                "success": True,
-                "message": "Container stopped successfully",
-                "state": ContainerState.STOPPED.value
-            }
+            except docker.errors.APIError as e:
+                logger.error(f"Failed to stop container: {e}")
+                self._set_state(ContainerState.ERROR)
+                return {
+                    "success": False,
+                    "error": str(e),
+                    "state": ContainerState.ERROR.value
+                }
 
-        except docker.errors.APIError as e:
-            logger.error(f"Failed to stop container: {e}")
-            self._state = ContainerState.ERROR
-            return {
-                "success": False,
-                "error": str(e),
-                "state": ContainerState.ERROR.value
-            }
+    async def watch_events(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield Docker events for the ComfyUI container as they happen.
+
+        The blocking docker-py event stream is read in a worker thread and
+        handed to the event loop through a queue. The cached state is updated
+        from each event before it is yielded. The iterator ends when the
+        stream closes.
+        """
+        config = get_config()
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stream = await asyncio.to_thread(
+            self.client.events,
+            decode=True,
+            filters={"container": config.container_name, "event": list(WATCHED_EVENTS)}
+        )
+
+        def pump() -> None:
+            try:
+                for event in stream:
+                    loop.call_soon_threadsafe(queue.put_nowait, event)
+            except Exception as e:
+                logger.debug("Docker event stream ended: %s", e)
+            finally:
+                try:
+                    loop.call_soon_threadsafe(queue.put_nowait, None)
+                except RuntimeError:
+                    pass  # Event loop already closed
+
+        pump_task = asyncio.ensure_future(asyncio.to_thread(pump))
+
+        try:
+            while (event := await queue.get()) is not None:
+                self._apply_event(event)
+                yield event
+        finally:
+            stream.close()
+            pump_task.cancel()
+
+    def _apply_event(self, event: Dict[str, Any]) -> None:
+        """Update the cached state from a Docker event."""
+        action = event.get("Action") or event.get("status")
+        if action == "start":
+            self._set_state(ContainerState.RUNNING)
+        elif action in ("die", "stop"):
+            self._set_state(ContainerState.STOPPED)
+        elif action != "kill":
+            return
+        # kill is sent for any signal, not only fatal ones; just re-inspect
+        self.invalidate_cache()
 
     def get_logs(self, tail: int = 100) -> List[str]:
         """Get recent container logs."""
@@ -199,8 +476,12 @@ class DockerManager:
             return ["Container not found"]
 
         try:
-            logs = container.logs(tail=tail, timestamps=True).decode("utf-8")
-            return logs.strip().split("\n") if logs.strip() else []
+            # Decode line by line from the stream instead of materializing
+            # and splitting the whole tail buffer. follow must be explicit:
+            # docker-py follows a stream by default, which never ends while
+            # the container runs.
+            stream = container.logs(tail=tail, timestamps=True, stream=True, follow=False)
+            return list(deque(_iter_log_lines(stream), maxlen=tail))
         except docker.errors.APIError as e:
             logger.error(f"Failed to get logs: {e}")
             return [f"Error getting logs: {e}"]
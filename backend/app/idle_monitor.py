@@ -5,10 +5,12 @@ Monitors ComfyUI activity and stops the container after idle timeout.
 
 import asyncio
 import logging
+from collections import deque
 from datetime import datetime
+from itertools import islice
 from typing import Optional, Callable, List, Awaitable
 
-from .config import get_config, config_manager
+from .config import Config, get_config, config_manager
 from .docker_manager import docker_manager, ContainerState
 from .comfyui_client import comfyui_client
 
@@ -18,18 +20,22 @@ logger = logging.getLogger(__name__)
 class ActivityEvent:
     """Represents an activity event for logging."""
 
+    __slots__ = ("event_type", "message", "timestamp", "_dict")
+
     def __init__(self, event_type: str, message: str):
         self.event_type = event_type
         self.message = message
         self.timestamp = datetime.now()
-
-    def to_dict(self):
-        return {
+        # Events never change, so serialize once up front
+        self._dict = {
             "type": self.event_type,
             "message": self.message,
             "timestamp": self.timestamp.isoformat()
         }
 
+    def to_dict(self):
+        return self._dict
+
 
 class IdleMonitor:
     """Monitors ComfyUI activity and triggers shutdown when idle."""
@@ -37,33 +43,90 @@ class IdleMonitor:
     def __init__(self):
         self._running: bool = False
         self._task: Optional[asyncio.Task] = None
+        self._events_task: Optional[asyncio.Task] = None
+        self._drain_task: Optional[asyncio.Task] = None
+        # Set by container events and config changes to wake the loop early
+        self._wake = asyncio.Event()
         self._last_check: Optional[datetime] = None
-        self._activity_log: List[ActivityEvent] = []
         self._max_log_entries: int = 100
+        # Bounded log: appends are O(1) and evict the oldest entry
+        self._activity_log: deque = deque(maxlen=self._max_log_entries)
+        # Events waiting to be recorded and logged by the drain task, so the
+        # monitor loop never blocks on a slow logging handler
+        self._event_queue: asyncio.Queue = asyncio.Queue(maxsize=1024)
         self._state_callbacks: List[Callable[[str], Awaitable[None]]] = []
+        # Config snapshot, replaced by the config listener on every change
+        self._config: Config = get_config()
+        config_manager.add_listener(self._on_config_change)
+
+    def _on_config_change(self, config: Config) -> None:
+        """Pick up a new configuration and re-evaluate immediately."""
+        previous = self._config
+        self._config = config
+        # The event stream is filtered by container at subscribe time, so
+        # follow the new container instead of the old one
+        target_changed = (
+            (config.container_name, config.docker_socket)
+            != (previous.container_name, previous.docker_socket)
+        )
+        if target_changed and self._events_task is not None:
+            self._events_task.cancel()
+            self._events_task = asyncio.create_task(self._watch_container_events())
+        self._wake.set()
 
     def add_state_callback(self, callback: Callable[[str], Awaitable[None]]) -> None:
         """Add a callback to be notified of state changes."""
         self._state_callbacks.append(callback)
 
     async def _notify_state_change(self, message: str) -> None:
-        """Notify all registered callbacks of a state change."""
-        for callback in self._state_callbacks:
-            try:
-                await callback(message)
-            except Exception as e:
-                logger.error(f"Error in state callback: {e}")
+        """Notify all registered callbacks of a state change concurrently."""
+        results = await asyncio.gather(
+            *(callback(message) for callback in self._state_callbacks),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Error in state callback: {result}")
 
     def _log_event(self, event_type: str, message: str) -> None:
-        """Add an event to the activity log."""
+        """Queue an event for the activity log."""
         event = ActivityEvent(event_type, message)
-        self._activity_log.append(event)
-
-        # Trim old entries
-        if len(self._activity_log) > self._max_log_entries:
-            self._activity_log = self._activity_log[-self._max_log_entries:]
+        try:
+            self._event_queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Drop the oldest pending event rather than the newest
+            self._event_queue.get_nowait()
+            self._event_queue.put_nowait(event)
+
+    async def _drain_events(self) -> None:
+        """Record and log queued activity events."""
+        while True:
+            event = await self._event_queue.get()
+            self._activity_log.append(event)
+            logger.info(f"[{event.event_type}] {event.message}")
+
+    async def _wait_for_wake(self, timeout: float) -> None:
+        """Sleep until a container event arrives or timeout seconds pass."""
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    async def _watch_container_events(self) -> None:
+        """Wake the monitor loop whenever the container starts or stops."""
+        while self._running:
+            try:
+                async for event in docker_manager.watch_events():
+                    logger.debug("Container event: %s", event.get("Action"))
+                    self._wake.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Docker event stream unavailable: {e}")
 
-        logger.info(f"[{event_type}] {message}")
+            # Stream ended or failed; reconnect after the poll interval
+            await asyncio.sleep(self._config.poll_interval_seconds)
 
     async def _monitor_loop(self) -> None:
         """Main monitoring loop."""
@@ -71,17 +134,18 @@ class IdleMonitor:
         self._log_event("system", "Idle monitor started")
 
         while self._running:
-            config = get_config()
+            config = self._config
+            wait_seconds: float = config.poll_interval_seconds
 
             try:
                 self._last_check = datetime.now()
 
                 # Check if container is running
-                status = docker_manager.get_status()
+                state = await docker_manager.get_state_async()
 
-                if status["state"] != ContainerState.RUNNING.value:
-                    # Container not running, nothing to monitor
-                    await asyncio.sleep(config.poll_interval_seconds)
+                if state is not ContainerState.RUNNING:
+                    # Container not running, nothing to monitor until it starts
+                    await self._wait_for_wake(config.poll_interval_seconds)
                     continue
 
                 # Poll ComfyUI queue
@@ -102,10 +166,17 @@ class IdleMonitor:
                         timeout_minutes = config.idle_timeout_minutes
 
                         logger.debug(
-                            f"Idle for {idle_minutes:.1f} minutes "
-                            f"(timeout: {timeout_minutes} minutes)"
+                            "Idle for %.1f minutes (timeout: %s minutes)",
+                            idle_minutes, timeout_minutes
                         )
 
+                        # Wake right at the deadline rather than up to a full
+                        # poll interval after it. Once past it, keep the poll
+                        # interval so a failing stop is not retried every second.
+                        remaining_seconds = timeout_minutes * 60 - idle_seconds
+                        if remaining_seconds > 0:
+                            wait_seconds = min(wait_seconds, max(1.0, remaining_seconds))
+
                         if idle_minutes >= timeout_minutes:
                             # Idle timeout exceeded, stop container
                             self._log_event(
@@ -130,7 +201,7 @@ class IdleMonitor:
                 logger.error(f"Error in monitor loop: {e}")
                 self._log_event("error", f"Monitor error: {e}")
 
-            await asyncio.sleep(config.poll_interval_seconds)
+            await self._wait_for_wake(wait_seconds)
 
         logger.info("Idle monitor stopped")
 
@@ -142,6 +213,8 @@ class IdleMonitor:
 
         self._running = True
         self._task = asyncio.create_task(self._monitor_loop())
+        self._events_task = asyncio.create_task(self._watch_container_events())
+        self._drain_task = asyncio.create_task(self._drain_events())
 
     def stop(self) -> None:
         """Stop the idle monitor."""
@@ -149,15 +222,21 @@ class IdleMonitor:
         if self._task:
             self._task.cancel()
             self._task = None
+        if self._events_task:
+            self._events_task.cancel()
+            self._events_task = None
+        if self._drain_task:
+            self._drain_task.cancel()
+            self._drain_task = None
 
     def get_activity_log(self, limit: int = 50) -> List[dict]:
         """Get recent activity log entries."""
-        entries = self._activity_log[-limit:]
-        return [e.to_dict() for e in reversed(entries)]
+        entries = islice(reversed(self._activity_log), limit)
+        return [e.to_dict() for e in entries]
 
     def get_idle_info(self) -> dict:
         """Get current idle status information."""
-        config = get_config()
+        config = self._config
         idle_seconds = comfyui_client.seconds_since_activity()
         idle_minutes = idle_seconds / 60
         timeout_minutes = config.idle_timeout_minutes
@@ -168,7 +247,9 @@ class IdleMonitor:
             "idle_minutes": round(idle_minutes, 1),
             "timeout_minutes": timeout_minutes,
             "remaining_minutes": round(remaining_minutes, 1),
-            "will_shutdown": remaining_minutes <= 0 and docker_manager.is_running(),
+            # Cached state: callers refresh the container status first, and
+            # this must not block the event loop on a Docker inspection
+            "will_shutdown": remaining_minutes <= 0 and docker_manager.state is ContainerState.RUNNING,
             "last_check": self._last_check.isoformat() if self._last_check else None
         }
 
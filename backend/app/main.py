@@ -8,26 +8,40 @@ Architecture:
 - API endpoints are at /api
 """
 
+import gzip
+import hashlib
 import logging
+import queue
+import re
 from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import HTMLResponse, RedirectResponse
 import os
 
 from .config import config_manager, get_config
 from .docker_manager import docker_manager
+from .comfyui_client import comfyui_client
 from .idle_monitor import idle_monitor
 from .proxy import proxy_handler
+from .status import status_snapshot
 from .routes import api, websocket
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+# Configure logging: the caller interpolates each message (and formats any
+# traceback) into a queued record; a listener thread applies the formatter
+# and writes it, keeping stream I/O off the event loop
+log_handler = logging.StreamHandler()
+log_handler.setFormatter(logging.Formatter(
+    "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+))
+log_queue: queue.SimpleQueue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, log_handler)
+logging.getLogger().addHandler(QueueHandler(log_queue))
+logging.getLogger().setLevel(logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -35,6 +49,7 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """Application lifespan handler."""
     # Startup
+    log_listener.start()
     logger.info("ComfyUI Docker Manager starting up...")
 
     # Load configuration
@@ -52,11 +67,19 @@ async def lifespan(app: FastAPI):
     idle_monitor.start()
     logger.info("Idle monitor started")
 
+    # Start the shared status producer used by WebSocket clients
+    status_snapshot.start()
+
     yield
 
     # Shutdown
     logger.info("ComfyUI Docker Manager shutting down...")
     idle_monitor.stop()
+    status_snapshot.stop()
+    docker_manager.stop_log_follower()
+    await proxy_handler.aclose()
+    await comfyui_client.aclose()
+    log_listener.stop()
 
 
 # Create FastAPI app
@@ -96,23 +119,74 @@ STATIC_DIR = os.environ.get("STATIC_DIR", os.path.join(os.path.dirname(__file__)
 if not os.path.isabs(STATIC_DIR):
     STATIC_DIR = os.path.abspath(STATIC_DIR)
 
-logger.info(f"Static directory: {STATIC_DIR}, exists: {os.path.exists(STATIC_DIR)}")
+# Probed once at import; nothing under STATIC_DIR changes at runtime
+STATIC_DIR_EXISTS = os.path.isdir(STATIC_DIR)
+ASSETS_DIR = os.path.join(STATIC_DIR, "assets")
+INDEX_PATH = os.path.join(STATIC_DIR, "index.html")
+
+logger.info(f"Static directory: {STATIC_DIR}, exists: {STATIC_DIR_EXISTS}")
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """Static files with content-hashed names that browsers may cache forever."""
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
 
 # Mount manager static assets - Vite builds with base: '/manager/' so assets are at /manager/assets/
-if os.path.exists(STATIC_DIR):
-    assets_dir = os.path.join(STATIC_DIR, "assets")
-    if os.path.exists(assets_dir):
-        app.mount("/manager/assets", StaticFiles(directory=assets_dir), name="manager-assets")
+# Vite minifies and fingerprints these files, so they never change under the same URL
+if STATIC_DIR_EXISTS and os.path.isdir(ASSETS_DIR):
+    app.mount("/manager/assets", ImmutableStaticFiles(directory=ASSETS_DIR), name="manager-assets")
+
+
+def _load_manager_index() -> Optional[bytes]:
+    """Read the built dashboard index.html once at startup."""
+    if not STATIC_DIR_EXISTS or not os.path.isfile(INDEX_PATH):
+        return None
+    with open(INDEX_PATH, "rb") as f:
+        return f.read()
+
+
+# The built index.html never changes at runtime, so keep it in memory
+# together with its gzip encoding and a strong ETag
+MANAGER_INDEX_HTML = _load_manager_index()
+MANAGER_INDEX_GZIP: Optional[bytes] = None
+MANAGER_INDEX_ETAG: Optional[str] = None
+if MANAGER_INDEX_HTML is not None:
+    MANAGER_INDEX_GZIP = gzip.compress(MANAGER_INDEX_HTML, 9)
+    MANAGER_INDEX_ETAG = f'"{hashlib.sha1(MANAGER_INDEX_HTML).hexdigest()}"'
 
 
 @app.get("/manager")
+async def redirect_manager():
+    """Redirect to the canonical dashboard URL."""
+    return RedirectResponse(url="/manager/", status_code=302)
+
+
 @app.get("/manager/")
-async def serve_manager():
+async def serve_manager(request: Request):
     """Serve the manager dashboard."""
-    if os.path.exists(STATIC_DIR):
-        index_path = os.path.join(STATIC_DIR, "index.html")
-        if os.path.exists(index_path):
-            return FileResponse(index_path)
+    if MANAGER_INDEX_HTML is not None:
+        # no-cache rather than max-age: index.html points at hashed assets
+        # that change on upgrade, so browsers revalidate (cheap 304) each load
+        headers = {
+            "ETag": MANAGER_INDEX_ETAG,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if MANAGER_INDEX_ETAG in (tag.strip() for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            return HTMLResponse(content=MANAGER_INDEX_GZIP, headers=headers)
+
+        return HTMLResponse(content=MANAGER_INDEX_HTML, headers=headers)
     return HTMLResponse(
         content="<h1>Manager frontend not built</h1><p>Run 'npm run build' in frontend directory.</p>",
         status_code=500
@@ -124,23 +198,40 @@ async def serve_manager():
 # All non-manager, non-api routes go to ComfyUI
 # =============================================================================
 
-# Catch-all route - MUST be last
-@app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS", "HEAD"])
-async def proxy_all(request: Request, path: str):
-    """Proxy all other requests to ComfyUI."""
-    # Don't proxy manager, api, ws, or health routes
-    if path.startswith(("manager", "api", "ws", "health", "docs", "openapi.json", "redoc")):
-        return None
-    return await proxy_handler.handle_request(request)
+# Path prefixes owned wholesale by the manager; unmatched requests under
+# them must not reach (or wake) ComfyUI. Everything else that no route above
+# handled - including ComfyUI's own /api/* endpoints - is proxied.
+RESERVED_PATH_RE = re.compile(r"^/(?:manager)(?:/|$)")
 
 
-@app.get("/")
-async def proxy_root(request: Request):
-    """Proxy root to ComfyUI or show manager link."""
-    return await proxy_handler.handle_request(request)
+async def proxy_app(scope, receive, send) -> None:
+    """ASGI app forwarding every request not matched by a route to ComfyUI."""
+    if scope["type"] == "websocket":
+        if RESERVED_PATH_RE.match(scope["path"]):
+            await send({"type": "websocket.close", "code": 1000})
+        else:
+            await proxy_handler.handle_websocket(WebSocket(scope, receive, send))
+        return
+
+    if RESERVED_PATH_RE.match(scope["path"]):
+        response = Response(content="Not Found", status_code=404, media_type="text/plain")
+    else:
+        response = await proxy_handler.handle_request(Request(scope, receive))
+    await response(scope, receive, send)
+
+
+# Mounted last so the explicit routes above are dispatched first by the router
+app.mount("/", proxy_app, name="comfyui-proxy")
 
 
 if __name__ == "__main__":
     import uvicorn
     config = get_config()
-    uvicorn.run("app.main:app", host="0.0.0.0", port=config.manager_port, reload=True)
+    # Single worker: the idle monitor and proxy state live in-process
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=config.manager_port,
+        loop="uvloop",
+        http="httptools"
+    )
@@ -4,22 +4,54 @@ Automatically starts the container when a request arrives.
 """
 
 import asyncio
+import html
 import logging
-from typing import Optional
-from datetime import datetime
+import re
+import time
+from collections import OrderedDict
+from urllib.parse import quote
+from typing import Optional, Dict, Any, List, Tuple
 
 import httpx
-from fastapi import Request, Response
-from fastapi.responses import HTMLResponse
+import websockets
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, Response, StreamingResponse
+from starlette.websockets import WebSocket, WebSocketDisconnect
 
-from .config import get_config
+from .config import Config, config_manager, get_config
 from .docker_manager import docker_manager, ContainerState
 from .comfyui_client import comfyui_client
 
 logger = logging.getLogger(__name__)
 
+# How long a request arriving mid-startup waits on the ready signal before
+# falling back to the starting page
+READY_WAIT_SECONDS = 2.0
 
-def get_starting_page(message: str = "The container was stopped to save resources. Please wait while it starts up.") -> str:
+# Hop-by-hop headers are never forwarded in either direction. Raw lowercase
+# bytes so headers are filtered without decoding them.
+HOP_BY_HOP_HEADERS = frozenset({b"connection", b"keep-alive", b"transfer-encoding", b"te", b"trailers", b"upgrade"})
+REQUEST_EXCLUDED_HEADERS = HOP_BY_HOP_HEADERS | {b"host"}
+
+# Bounds for the in-memory cache of long-lived static assets
+ASSET_CACHE_MAX_ENTRIES = 200
+ASSET_CACHE_MAX_BYTES = 64 * 1024 * 1024
+ASSET_CACHE_MAX_ENTRY_BYTES = 4 * 1024 * 1024
+# Responses must allow caching for at least this long (seconds) to be kept
+ASSET_CACHE_MIN_MAX_AGE = 3600
+
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+# Messages shown on the starting page
+DEFAULT_STARTING_MESSAGE = "The container was stopped to save resources. Please wait while it starts up."
+RUNNING_NOT_READY_MESSAGE = "Container is running, waiting for ComfyUI to initialize..."
+STARTING_UP_MESSAGE = "Container is starting up..."
+STARTING_CONTAINER_MESSAGE = "Starting the container..."
+
+
+def get_starting_page(message: str = DEFAULT_STARTING_MESSAGE) -> str:
     """Generate the starting page HTML with a custom message."""
     return f"""
 <!DOCTYPE html>
@@ -80,21 +112,23 @@ def get_starting_page(message: str = "The container was stopped to save resource
         }}
     </style>
     <script>
-        // Check if ComfyUI is ready every 3 seconds
-        async function checkReady() {{
-            try {{
-                const response = await fetch('/api/status');
-                const data = await response.json();
-                if (data.queue && data.queue.connected) {{
+        // Subscribe to the manager's status push instead of polling
+        function connect() {{
+            const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+            const ws = new WebSocket(`${{protocol}}//${{window.location.host}}/manager/ws`);
+            ws.onmessage = (event) => {{
+                const message = JSON.parse(event.data);
+                if (message.data && message.data.queue && message.data.queue.connected) {{
                     // ComfyUI is ready, reload to proxy through
                     window.location.reload();
                 }}
-            }} catch (e) {{
-                console.log('Still waiting...', e);
-            }}
+            }};
+            ws.onclose = () => {{
+                console.log('Still waiting...');
+                setTimeout(connect, 3000);
+            }};
         }}
-        setInterval(checkReady, 3000);
-        setTimeout(checkReady, 1000);
+        connect();
     </script>
 </head>
 <body>
@@ -112,160 +146,455 @@ def get_starting_page(message: str = "The container was stopped to save resource
 """
 
 
+# Starting pages are served on every request while the container boots,
+# so render and encode the known variants once
+_STARTING_PAGES = {
+    message: get_starting_page(message).encode("utf-8")
+    for message in (
+        DEFAULT_STARTING_MESSAGE,
+        RUNNING_NOT_READY_MESSAGE,
+        STARTING_UP_MESSAGE,
+        STARTING_CONTAINER_MESSAGE,
+    )
+}
+
+
+# Shown when the container is stopped and auto-start is disabled
+STOPPED_PAGE = b"""
+<html>
+<head><title>ComfyUI Stopped</title></head>
+<body style="font-family: sans-serif; display: flex; justify-content: center; align-items: center; height: 100vh; margin: 0; background: #1a1a2e; color: #eee;">
+    <div style="text-align: center;">
+        <h1>ComfyUI is stopped</h1>
+        <p>Auto-start is disabled.</p>
+        <p><a href="/manager" style="color: #4ade80;">Open Manager Dashboard</a> to start it manually.</p>
+    </div>
+</body>
+</html>
+"""
+
+# Shown when an auto-start fails; the escaped error goes between the halves
+START_FAILED_PAGE_PREFIX = b"""
+<html>
+<head><title>Start Failed</title></head>
+<body style="font-family: sans-serif; display: flex; justify-content: center; align-items: center; height: 100vh; margin: 0; background: #1a1a2e; color: #eee;">
+    <div style="text-align: center;">
+        <h1>Failed to start ComfyUI</h1>
+        <p style="color: #f87171;">"""
+START_FAILED_PAGE_SUFFIX = b"""</p>
+        <p><a href="/manager" style="color: #4ade80;">Open Manager Dashboard</a></p>
+    </div>
+</body>
+</html>
+"""
+
+
+def starting_page_response(message: str = DEFAULT_STARTING_MESSAGE) -> HTMLResponse:
+    """Build a 503 response carrying the starting page for message."""
+    content = _STARTING_PAGES.get(message)
+    if content is None:
+        content = get_starting_page(message).encode("utf-8")
+    return HTMLResponse(content=content, status_code=503)
+
+
+def _asset_lifetime(response: httpx.Response) -> Optional[int]:
+    """Get how long a proxied response may be cached, or None if it may not."""
+    if response.status_code != 200 or "set-cookie" in response.headers or "vary" in response.headers:
+        return None
+
+    # Encoded bodies are relayed untouched, but are only right for clients
+    # that negotiated the encoding, so never replay them to others
+    if response.headers.get("content-encoding", "identity").lower() != "identity":
+        return None
+
+    content_length = response.headers.get("content-length")
+    if not content_length or not content_length.isdigit() or int(content_length) > ASSET_CACHE_MAX_ENTRY_BYTES:
+        return None
+
+    cache_control = response.headers.get("cache-control", "").lower()
+    if "no-store" in cache_control or "no-cache" in cache_control or "private" in cache_control:
+        return None
+
+    match = MAX_AGE_RE.search(cache_control)
+    max_age = int(match.group(1)) if match else None
+    if "immutable" in cache_control:
+        return max_age or 31536000
+    if max_age is not None and max_age >= ASSET_CACHE_MIN_MAX_AGE:
+        return max_age
+    return None
+
+
+def _request_target(scope: Dict[str, Any]) -> bytes:
+    """Build the still-encoded path and query to forward upstream.
+
+    raw_path is optional in ASGI; without it the decoded path is re-encoded.
+    """
+    raw_path = scope.get("raw_path") or quote(scope["path"]).encode()
+    query_string = scope.get("query_string")
+    if query_string:
+        raw_path += b"?" + query_string
+    return raw_path
+
+
+class AssetCache:
+    """LRU cache of static ComfyUI assets the upstream marked long-lived.
+
+    Entries expire after the upstream max-age; the cache is bounded by
+    entry count and total body size. Hits carry an Age header counted from
+    when the entry was stored, so browsers shorten their freshness to match.
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[bytes, Tuple[float, float, List[Tuple[bytes, bytes]], bytes]]" = OrderedDict()
+        self._size = 0
+
+    def get(self, key: bytes) -> Optional[Response]:
+        """Build a response from a fresh cached entry."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        stored_at, expires_at, headers, body = entry
+        now = time.monotonic()
+        if now >= expires_at:
+            self._remove(key)
+            return None
+
+        self._entries.move_to_end(key)
+        response = Response(content=body)
+        response.raw_headers = [*headers, (b"age", str(int(now - stored_at)).encode())]
+        return response
+
+    def put(self, key: bytes, lifetime: int, headers: List[Tuple[bytes, bytes]], body: bytes) -> None:
+        """Store an asset, evicting least recently used entries as needed."""
+        self._remove(key)
+        # The upstream Date and Age describe the original response only;
+        # the server stamps a fresh Date and get() supplies the Age
+        headers = [(name, value) for name, value in headers if name not in (b"date", b"age")]
+        now = time.monotonic()
+        self._entries[key] = (now, now + lifetime, headers, body)
+        self._size += len(body)
+
+        while len(self._entries) > ASSET_CACHE_MAX_ENTRIES or self._size > ASSET_CACHE_MAX_BYTES:
+            _, (_, _, _, evicted) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def clear(self) -> None:
+        """Drop every cached asset."""
+        self._entries.clear()
+        self._size = 0
+
+    def _remove(self, key: bytes) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[3])
+
+
 class ProxyHandler:
     """Handles reverse proxy requests to ComfyUI."""
 
     def __init__(self):
         self._starting: bool = False
-        self._start_time: Optional[datetime] = None
+        # Monotonic so the measured startup time survives clock adjustments
+        self._start_time: Optional[float] = None
+        # Single-flight container start shared by concurrent wake-up requests
+        self._start_task: Optional[asyncio.Task] = None
+        self._ready_task: Optional[asyncio.Task] = None
+        # Bound once and replaced by the config listener on every change
+        self._config: Config = get_config()
+        self._base_url = httpx.URL(self._config.comfyui_url)
+        self._asset_cache = AssetCache()
+        config_manager.add_listener(self._on_config_change)
+        docker_manager.add_state_listener(self._on_state_change)
+        # Shared client so keep-alive connections to ComfyUI are reused
+        # No read timeout: streamed bodies (progress streams, large outputs)
+        # may legitimately stay open well past any fixed deadline. A short
+        # connect timeout falls back to the starting page quickly.
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(60.0, connect=2.0, read=None, pool=5.0),
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=128)
+        )
+
+    def _on_config_change(self, config: Config) -> None:
+        """Rebind the configuration and re-parse the upstream base URL."""
+        self._config = config
+        self._base_url = httpx.URL(config.comfyui_url)
+        # Cached assets may belong to a different upstream
+        self._asset_cache.clear()
+
+    def _on_state_change(self, state: ContainerState) -> None:
+        """Drop the ready signal as soon as the container leaves RUNNING."""
+        if state is not ContainerState.RUNNING:
+            comfyui_client.ready_event.clear()
+
+    async def aclose(self) -> None:
+        """Close the pooled upstream connections."""
+        await self._client.aclose()
 
     async def handle_request(self, request: Request) -> Response:
         """Handle an incoming request, starting container if needed."""
-        config = get_config()
+        config = self._config
 
         # Update activity timestamp for any incoming request
         comfyui_client.update_activity()
 
-        # Check container status
-        status = docker_manager.get_status()
-        container_state = status.get("state")
-
-        logger.debug(f"Proxy request: path={request.url.path}, state={container_state}, starting={self._starting}")
+        if comfyui_client.ready_event.is_set():
+            # ComfyUI answered recently, so the container is running. The
+            # event is cleared on any state change away from RUNNING and on
+            # a failed connection, so no Docker round trip is needed.
+            container_state = ContainerState.RUNNING.value
+        else:
+            # Check container status off the event loop so concurrent proxied
+            # requests are not serialized behind the blocking Docker API call
+            status = await docker_manager.get_status_async()
+            container_state = status.get("state")
+
+        logger.debug(
+            "Proxy request: path=%s, state=%s, starting=%s",
+            request.scope["path"], container_state, self._starting
+        )
 
         # If container is running, try to proxy the request
         if container_state == ContainerState.RUNNING.value:
+            if self._starting:
+                await self._wait_until_ready(READY_WAIT_SECONDS)
             response = await self._proxy_request(request)
             if response is not None:
                 return response
             # Proxy failed, ComfyUI not ready yet
-            return HTMLResponse(
-                content=get_starting_page("Container is running, waiting for ComfyUI to initialize..."),
-                status_code=503
-            )
+            return starting_page_response(RUNNING_NOT_READY_MESSAGE)
+
+        # A wake-up is still starting the container: share its result, so a
+        # failed start shows the error page to every waiting request
+        if self._start_task is not None:
+            return await self._start_and_wait(request)
 
-        # If container is starting, show waiting page
+        # If container is starting, give ComfyUI a moment to come up so the
+        # first request after readiness is proxied instead of bounced
         if container_state == ContainerState.STARTING.value or self._starting:
-            return HTMLResponse(
-                content=get_starting_page("Container is starting up..."),
-                status_code=503
-            )
+            if await self._wait_until_ready(READY_WAIT_SECONDS):
+                response = await self._proxy_request(request)
+                if response is not None:
+                    return response
+            return starting_page_response(STARTING_UP_MESSAGE)
 
         # Container is stopped - start it if auto-start is enabled
         if config.auto_start_enabled:
             return await self._start_and_wait(request)
         else:
-            return HTMLResponse(
-                content="""
-                <html>
-                <head><title>ComfyUI Stopped</title></head>
-                <body style="font-family: sans-serif; display: flex; justify-content: center; align-items: center; height: 100vh; margin: 0; background: #1a1a2e; color: #eee;">
-                    <div style="text-align: center;">
-                        <h1>ComfyUI is stopped</h1>
-                        <p>Auto-start is disabled.</p>
-                        <p><a href="/manager" style="color: #4ade80;">Open Manager Dashboard</a> to start it manually.</p>
-                    </div>
-                </body>
-                </html>
-                """,
-                status_code=503
+            return HTMLResponse(content=STOPPED_PAGE, status_code=503)
+
+    async def handle_websocket(self, websocket: WebSocket) -> None:
+        """Relay a WebSocket connection (e.g. ComfyUI's /ws) to ComfyUI.
+
+        WebSockets never wake the container; if ComfyUI is not reachable
+        the handshake is rejected and the client retries as usual.
+        """
+        comfyui_client.update_activity()
+
+        raw_path = _request_target(websocket.scope)
+        target_url = self._base_url.copy_with(scheme="ws", raw_path=raw_path)
+
+        try:
+            upstream = await websockets.connect(
+                str(target_url),
+                subprotocols=websocket.scope.get("subprotocols") or None,
+                max_size=None,
+                open_timeout=5
             )
+        except Exception as e:
+            logger.debug("Cannot open WebSocket to ComfyUI: %s", e)
+            await websocket.close(code=1013)
+            return
+
+        try:
+            await websocket.accept(subprotocol=upstream.subprotocol)
+        except BaseException:
+            await upstream.close()
+            raise
+
+        async def client_to_upstream() -> None:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                if message.get("text") is not None:
+                    await upstream.send(message["text"])
+                elif message.get("bytes") is not None:
+                    await upstream.send(message["bytes"])
+
+        async def upstream_to_client() -> None:
+            async for message in upstream:
+                if isinstance(message, str):
+                    await websocket.send_text(message)
+                else:
+                    await websocket.send_bytes(message)
+
+        # Relay both directions until either side goes away
+        tasks = [
+            asyncio.create_task(client_to_upstream()),
+            asyncio.create_task(upstream_to_client()),
+        ]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Retrieve every outcome so a relay that ended with an error
+            # (either side dropping) is not reported as never retrieved
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.debug("WebSocket relay ended: %s", result)
+            await upstream.close()
+            try:
+                await websocket.close()
+            except (RuntimeError, WebSocketDisconnect):
+                pass  # Client already disconnected
 
     async def _start_and_wait(self, request: Request) -> Response:
-        """Start the container and return a waiting page."""
-        if not self._starting:
+        """Start the container and return a waiting page.
+
+        The first caller launches the start; concurrent callers await the
+        same task rather than issuing their own Docker start.
+        """
+        if self._start_task is None:
             self._starting = True
-            self._start_time = datetime.now()
+            self._start_time = time.monotonic()
+            comfyui_client.ready_event.clear()
+            # The container may come back with an upgraded ComfyUI
+            self._asset_cache.clear()
 
             logger.info("Auto-starting ComfyUI container due to incoming request")
+            self._start_task = asyncio.create_task(self._do_start())
 
-            result = await docker_manager.start_container()
+        # Shielded so a disconnecting client does not cancel the shared start
+        result = await asyncio.shield(self._start_task)
 
-            if not result.get("success"):
-                self._starting = False
-                return HTMLResponse(
-                    content=f"""
-                    <html>
-                    <head><title>Start Failed</title></head>
-                    <body style="font-family: sans-serif; display: flex; justify-content: center; align-items: center; height: 100vh; margin: 0; background: #1a1a2e; color: #eee;">
-                        <div style="text-align: center;">
-                            <h1>Failed to start ComfyUI</h1>
-                            <p style="color: #f87171;">{result.get('error')}</p>
-                            <p><a href="/manager" style="color: #4ade80;">Open Manager Dashboard</a></p>
-                        </div>
-                    </body>
-                    </html>
-                    """,
-                    status_code=500
-                )
+        if not result.get("success"):
+            error = html.escape(str(result.get("error"))).encode("utf-8")
+            return HTMLResponse(
+                content=START_FAILED_PAGE_PREFIX + error + START_FAILED_PAGE_SUFFIX,
+                status_code=500
+            )
 
-            asyncio.create_task(self._wait_for_ready())
+        return starting_page_response(STARTING_CONTAINER_MESSAGE)
 
-        return HTMLResponse(
-            content=get_starting_page("Starting the container..."),
-            status_code=503
-        )
+    async def _do_start(self) -> Dict[str, Any]:
+        """Start the container, then wait for readiness in the background."""
+        result: Dict[str, Any] = {"success": False, "error": "Container start failed"}
+        try:
+            result = await docker_manager.start_container()
+        finally:
+            if result.get("success"):
+                self._ready_task = asyncio.create_task(self._wait_for_ready())
+            else:
+                self._starting = False
+            self._start_task = None
+        return result
 
     async def _wait_for_ready(self) -> None:
         """Wait for ComfyUI to become ready."""
-        config = get_config()
+        config = self._config
 
         try:
             ready = await comfyui_client.wait_for_ready(config.startup_timeout_seconds)
             if ready:
-                logger.info("ComfyUI is now ready to accept requests")
+                logger.info(
+                    f"ComfyUI is now ready to accept requests "
+                    f"({time.monotonic() - self._start_time:.1f}s after start)"
+                )
             else:
                 logger.warning("ComfyUI did not become ready in time")
         finally:
             self._starting = False
 
-    async def _proxy_request(self, request: Request) -> Optional[Response]:
-        """Proxy the request to ComfyUI. Returns None if connection fails."""
-        config = get_config()
+    async def _wait_until_ready(self, timeout: float) -> bool:
+        """Wait up to timeout seconds for the ready signal."""
+        try:
+            await asyncio.wait_for(comfyui_client.ready_event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
 
-        # Use the request path directly - no prefix stripping needed
-        path = request.url.path
-        if not path:
-            path = "/"
+    async def _proxy_request(self, request: Request) -> Optional[Response]:
+        """Proxy the request to ComfyUI, streaming the response body.
 
-        target_url = f"{config.comfyui_url}{path}"
-        if request.url.query:
-            target_url += f"?{request.url.query}"
+        Returns None if the connection fails.
+        """
+        # Forward the raw, still-encoded path and query bytes as received -
+        # no prefix stripping or decode/re-encode round trip needed
+        raw_path = _request_target(request.scope)
 
-        logger.debug(f"Proxying to: {target_url}")
+        # Only plain GETs are served from or stored in the asset cache
+        cacheable = request.method == "GET" and "range" not in request.headers
+        if cacheable:
+            cached = self._asset_cache.get(raw_path)
+            if cached is not None:
+                return cached
 
-        body = await request.body()
+        target_url = self._base_url.copy_with(raw_path=raw_path)
 
-        headers = {}
-        hop_by_hop = {"connection", "keep-alive", "transfer-encoding", "te", "trailers", "upgrade"}
-        for key, value in request.headers.items():
-            if key.lower() not in hop_by_hop and key.lower() != "host":
-                headers[key] = value
+        logger.debug("Proxying to: %s", target_url)
 
-        try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.request(
-                    method=request.method,
-                    url=target_url,
-                    headers=headers,
-                    content=body,
-                    follow_redirects=False
-                )
+        # ASGI header names are already lowercase bytes
+        headers = [
+            (key, value) for key, value in request.headers.raw
+            if key not in REQUEST_EXCLUDED_HEADERS
+        ]
 
-                content = response.content
+        # Stream uploads straight through instead of buffering them; an
+        # inbound Content-Length is forwarded, otherwise httpx sends chunked
+        has_body = "content-length" in request.headers or "transfer-encoding" in request.headers
+        body = request.stream() if has_body else None
 
-                response_headers = {}
-                for key, value in response.headers.items():
-                    if key.lower() not in hop_by_hop:
-                        response_headers[key] = value
+        try:
+            upstream_request = self._client.build_request(
+                method=request.method,
+                url=target_url,
+                headers=headers,
+                content=body
+            )
+            response = await self._client.send(
+                upstream_request,
+                stream=True,
+                follow_redirects=False
+            )
 
-                return Response(
-                    content=content,
-                    status_code=response.status_code,
-                    headers=response_headers
-                )
+            # Copied as a raw list so repeated headers such as Set-Cookie
+            # survive instead of being merged or overwritten
+            response_headers = [
+                (key.lower(), value) for key, value in response.headers.raw
+                if key.lower() not in HOP_BY_HOP_HEADERS
+            ]
+
+            lifetime = _asset_lifetime(response) if cacheable else None
+            if lifetime is not None:
+                try:
+                    body = b"".join([chunk async for chunk in response.aiter_raw()])
+                finally:
+                    await response.aclose()
+                self._asset_cache.put(raw_path, lifetime, response_headers, body)
+                proxied = Response(content=body)
+                proxied.raw_headers = list(response_headers)
+                return proxied
+
+            # Stream the raw body through so large outputs are never buffered
+            # and Content-Encoding/Content-Length still match the bytes sent.
+            # Relayed as read (httpcore reads up to 64 KiB at a time) so
+            # incremental bodies such as event streams are not held back.
+            proxied = StreamingResponse(
+                response.aiter_raw(),
+                status_code=response.status_code,
+                background=BackgroundTask(response.aclose)
+            )
+            proxied.raw_headers.extend(response_headers)
+            return proxied
 
         except httpx.ConnectError:
             logger.debug("Cannot connect to ComfyUI - not ready yet")
+            # Make the next request consult Docker instead of the fast path
+            comfyui_client.ready_event.clear()
             return None
         except httpx.TimeoutException:
             logger.warning("Timeout connecting to ComfyUI")
@@ -273,7 +602,7 @@ class ProxyHandler:
         except Exception as e:
             logger.error(f"Proxy error: {e}")
             return HTMLResponse(
-                content=f"<h1>Proxy Error</h1><p>{str(e)}</p>",
+                content=f"<h1>Proxy Error</h1><p>{html.escape(str(e))}</p>",
                 status_code=502
             )
 
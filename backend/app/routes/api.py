@@ -2,22 +2,25 @@
 REST API endpoints for the manager.
 """
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Optional
 
 from ..docker_manager import docker_manager
 from ..comfyui_client import comfyui_client
 from ..idle_monitor import idle_monitor
 from ..config import config_manager, get_config
+from ..status import status_snapshot
 
 router = APIRouter(prefix="/api", tags=["api"])
 
 
 class ConfigUpdate(BaseModel):
     """Configuration update request."""
-    idle_timeout_minutes: Optional[int] = None
-    poll_interval_seconds: Optional[int] = None
+    # Idle timeout between 1 minute and 24 hours
+    idle_timeout_minutes: Optional[int] = Field(None, ge=1, le=1440)
+    # Poll interval between 10 seconds and 5 minutes
+    poll_interval_seconds: Optional[int] = Field(None, ge=10, le=300)
     auto_start_enabled: Optional[bool] = None
     container_name: Optional[str] = None
 
@@ -30,33 +33,13 @@ class StatusResponse(BaseModel):
     config: dict
 
 
-@router.get("/status")
-async def get_status() -> StatusResponse:
+@router.get("/status", response_model=StatusResponse)
+async def get_status() -> Dict[str, Any]:
     """Get complete system status."""
-    # Get container status
-    container_status = docker_manager.get_status()
-
-    # Get queue status (may fail if container is stopped)
-    queue_status = await comfyui_client.get_queue_status()
-
-    # Get idle info
-    idle_info = idle_monitor.get_idle_info()
-
-    # Get config
-    config = get_config()
-
-    return StatusResponse(
-        container=container_status,
-        queue=queue_status.to_dict(),
-        idle=idle_info,
-        config={
-            "idle_timeout_minutes": config.idle_timeout_minutes,
-            "poll_interval_seconds": config.poll_interval_seconds,
-            "auto_start_enabled": config.auto_start_enabled,
-            "container_name": config.container_name,
-            "comfyui_url": config.comfyui_browser_url,
-        }
-    )
+    # Shares one recent collection with the WebSocket broadcasts and any
+    # concurrent pollers
+    # Serialized by pydantic-core through the response model
+    return await status_snapshot.get_or_refresh()
 
 
 @router.post("/start")
@@ -106,19 +89,6 @@ async def update_configuration(update: ConfigUpdate):
     if not updates:
         raise HTTPException(status_code=400, detail="No configuration updates provided")
 
-    # Validate values
-    if "idle_timeout_minutes" in updates:
-        if updates["idle_timeout_minutes"] < 1:
-            raise HTTPException(status_code=400, detail="Idle timeout must be at least 1 minute")
-        if updates["idle_timeout_minutes"] > 1440:  # 24 hours
-            raise HTTPException(status_code=400, detail="Idle timeout cannot exceed 24 hours")
-
-    if "poll_interval_seconds" in updates:
-        if updates["poll_interval_seconds"] < 10:
-            raise HTTPException(status_code=400, detail="Poll interval must be at least 10 seconds")
-        if updates["poll_interval_seconds"] > 300:
-            raise HTTPException(status_code=400, detail="Poll interval cannot exceed 5 minutes")
-
     # Apply updates
     config = config_manager.update(**updates)
 
@@ -135,25 +105,15 @@ async def update_configuration(update: ConfigUpdate):
 
 
 @router.get("/logs")
-async def get_logs(tail: int = 100):
+async def get_logs(tail: int = Query(100, ge=1, le=1000)):
     """Get recent container logs."""
-    if tail < 1:
-        tail = 1
-    if tail > 1000:
-        tail = 1000
-
-    logs = docker_manager.get_logs(tail=tail)
+    logs = await docker_manager.get_logs_async(tail=tail)
     return {"logs": logs}
 
 
 @router.get("/activity")
-async def get_activity_log(limit: int = 50):
+async def get_activity_log(limit: int = Query(50, ge=1, le=100)):
     """Get recent activity log from the idle monitor."""
-    if limit < 1:
-        limit = 1
-    if limit > 100:
-        limit = 100
-
     events = idle_monitor.get_activity_log(limit=limit)
     return {"events": events}
 
@@ -4,32 +4,72 @@ WebSocket handler for real-time updates.
 
 import asyncio
 import logging
-from typing import Set
+import time
+from typing import Set, Optional, Dict, Any, Iterable
 from datetime import datetime
 
+import orjson
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
-from ..docker_manager import docker_manager
-from ..comfyui_client import comfyui_client
 from ..idle_monitor import idle_monitor
-from ..config import get_config
+from ..status import status_snapshot
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Unchanged statuses are still pushed this often (seconds) as a heartbeat
+HEARTBEAT_SECONDS = 30.0
+
+# Messages buffered per client; a client that falls further behind loses
+# its oldest pending messages instead of holding up everyone else
+CLIENT_QUEUE_SIZE = 16
+
+# Status fields that change on every collection without meaning anything
+# changed; ignored when deciding whether a broadcast is worth sending
+VOLATILE_FIELDS = {
+    "queue": ("timestamp",),
+    "idle": ("idle_seconds", "last_check"),
+}
+
+
+def _status_fingerprint(data: Dict[str, Any]) -> bytes:
+    """Serialize the meaningful part of a status for change detection."""
+    stable = {
+        key: (
+            {k: v for k, v in value.items() if k not in VOLATILE_FIELDS[key]}
+            if key in VOLATILE_FIELDS else value
+        )
+        for key, value in data.items()
+    }
+    return orjson.dumps(stable, option=orjson.OPT_SORT_KEYS, default=str)
+
 
 class ConnectionManager:
     """Manages WebSocket connections."""
 
     def __init__(self):
         self.active_connections: Set[WebSocket] = set()
+        # Per-client outgoing queue and the task writing it to the socket
+        self._outboxes: Dict[WebSocket, asyncio.Queue] = {}
+        self._writers: Dict[WebSocket, asyncio.Task] = {}
         self._broadcast_task: asyncio.Task = None
+        # Fingerprint of the last broadcast status; None forces the next one
+        self._last_fingerprint: Optional[bytes] = None
+        self._last_sent: float = 0.0
+        # Clients that opted into top-level diffs instead of full statuses
+        self._delta_connections: Set[WebSocket] = set()
+        # Last broadcast status, the base that deltas are computed against
+        self._last_data: Optional[Dict[str, Any]] = None
+        self._last_timestamp: Optional[str] = None
 
     async def connect(self, websocket: WebSocket):
         """Accept and track a new connection."""
         await websocket.accept()
         self.active_connections.add(websocket)
+        self._outboxes[websocket] = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self._writers[websocket] = asyncio.create_task(self._write_loop(websocket))
+        status_snapshot.subscribe()
         logger.info(f"WebSocket connected. Total connections: {len(self.active_connections)}")
 
         # Start broadcast task if not running
@@ -38,59 +78,143 @@ class ConnectionManager:
 
     def disconnect(self, websocket: WebSocket):
         """Remove a connection."""
-        self.active_connections.discard(websocket)
-        logger.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
-
-    async def broadcast(self, message: dict):
-        """Send message to all connected clients."""
-        if not self.active_connections:
+        self._delta_connections.discard(websocket)
+        self._outboxes.pop(websocket, None)
+        writer = self._writers.pop(websocket, None)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
+        if websocket in self.active_connections:
+            self.active_connections.discard(websocket)
+            status_snapshot.unsubscribe()
+            logger.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
+
+    def _enqueue(self, websocket: WebSocket, text: str) -> None:
+        """Queue an encoded message for one client."""
+        outbox = self._outboxes.get(websocket)
+        if outbox is None:
+            return
+        try:
+            outbox.put_nowait(text)
+        except asyncio.QueueFull:
+            if websocket in self._delta_connections and self._last_data is not None:
+                # Deltas build on each other, so none may be dropped; replace
+                # the backlog with the latest full status instead
+                while not outbox.empty():
+                    outbox.get_nowait()
+                outbox.put_nowait(orjson.dumps({
+                    "type": "status_update",
+                    "timestamp": self._last_timestamp,
+                    "data": self._last_data
+                }).decode())
+            else:
+                # Slow consumer: drop its oldest pending message
+                outbox.get_nowait()
+                outbox.put_nowait(text)
+
+    async def _write_loop(self, websocket: WebSocket) -> None:
+        """Write a client's queued messages to its socket in order."""
+        outbox = self._outboxes[websocket]
+        try:
+            while True:
+                text = await outbox.get()
+                await websocket.send_text(text)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug("Failed to send to client: %s", e)
+            self.disconnect(websocket)
+
+    async def send(self, websocket: WebSocket, message: dict) -> None:
+        """Queue a message for a single client."""
+        self._enqueue(websocket, orjson.dumps(message).decode())
+
+    async def broadcast(self, message: dict, connections: Optional[Iterable[WebSocket]] = None):
+        """Queue message for the given clients (default: all).
+
+        Returns without waiting for any socket, so one slow client never
+        delays delivery to the others.
+        """
+        connections = list(self.active_connections if connections is None else connections)
+        if not connections:
             return
 
-        disconnected = set()
-
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.debug(f"Failed to send to client: {e}")
-                disconnected.add(connection)
+        # Encode once for every client instead of once per send_json call;
+        # sent as text frames, which is what the dashboard expects
+        text = orjson.dumps(message).decode()
+
+        for connection in connections:
+            self._enqueue(connection, text)
+
+    async def enable_delta(self, websocket: WebSocket) -> None:
+        """Switch a client to status_delta messages.
+
+        The client first receives the full status the following deltas
+        are relative to.
+        """
+        if self._last_data is None:
+            status = await status_snapshot.get_or_refresh()
+            # A broadcast may have run meanwhile; deltas then follow that one
+            if self._last_data is None:
+                self._last_data = status
+                self._last_timestamp = status_snapshot.collected_at
+
+        await self.send(websocket, {
+            "type": "status_update",
+            "timestamp": self._last_timestamp,
+            "data": self._last_data
+        })
+        # Only once the base is queued, so no delta can precede it
+        self._delta_connections.add(websocket)
 
-        # Clean up disconnected clients
-        self.active_connections -= disconnected
+    def force_next_broadcast(self) -> None:
+        """Send the next status update even if nothing appears changed."""
+        self._last_fingerprint = None
 
     async def _broadcast_loop(self):
-        """Periodically broadcast status updates to all clients."""
+        """Push each status published by the shared producer to all clients."""
         while self.active_connections:
             try:
-                # Build status update
-                container_status = docker_manager.get_status()
-                queue_status = await comfyui_client.get_queue_status()
-                idle_info = idle_monitor.get_idle_info()
-                config = get_config()
+                data = await status_snapshot.wait_for_update()
+                timestamp = status_snapshot.collected_at
+
+                # Skip frames that would not change anything for clients,
+                # apart from a periodic heartbeat
+                fingerprint = _status_fingerprint(data)
+                now = time.monotonic()
+                if fingerprint == self._last_fingerprint and now - self._last_sent < HEARTBEAT_SECONDS:
+                    continue
+                self._last_fingerprint = fingerprint
+                self._last_sent = now
 
                 message = {
                     "type": "status_update",
-                    "timestamp": datetime.now().isoformat(),
-                    "data": {
-                        "container": container_status,
-                        "queue": queue_status.to_dict(),
-                        "idle": idle_info,
-                        "config": {
-                            "idle_timeout_minutes": config.idle_timeout_minutes,
-                            "auto_start_enabled": config.auto_start_enabled,
-                            "comfyui_url": config.comfyui_browser_url,
-                        }
-                    }
+                    "timestamp": timestamp,
+                    "data": data
                 }
 
-                await self.broadcast(message)
+                # Recorded before queuing, so a delta client that overflows
+                # is resynced with the status this delta was built from
+                last = self._last_data
+                self._last_data = data
+                self._last_timestamp = timestamp
+
+                if self._delta_connections:
+                    # Top-level sections that differ from the last broadcast
+                    delta = data if last is None else {
+                        key: value for key, value in data.items() if last.get(key) != value
+                    }
+                    await self.broadcast(message, self.active_connections - self._delta_connections)
+                    await self.broadcast({
+                        "type": "status_delta",
+                        "timestamp": timestamp,
+                        "data": delta
+                    }, self._delta_connections)
+                else:
+                    await self.broadcast(message)
 
             except Exception as e:
                 logger.error(f"Error in broadcast loop: {e}")
 
-            # Wait before next update
-            await asyncio.sleep(2)
-
         logger.info("Broadcast loop stopped - no active connections")
 
 
@@ -98,31 +222,20 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 
-@router.websocket("/ws")
+# Under /manager so ComfyUI's own /ws can be proxied at the root
+@router.websocket("/manager/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time updates."""
     await manager.connect(websocket)
 
     try:
         # Send initial status
-        container_status = docker_manager.get_status()
-        queue_status = await comfyui_client.get_queue_status()
-        idle_info = idle_monitor.get_idle_info()
-        config = get_config()
+        status = await status_snapshot.get_or_refresh()
 
-        await websocket.send_json({
+        await manager.send(websocket, {
             "type": "initial_status",
-            "timestamp": datetime.now().isoformat(),
-            "data": {
-                "container": container_status,
-                "queue": queue_status.to_dict(),
-                "idle": idle_info,
-                "config": {
-                    "idle_timeout_minutes": config.idle_timeout_minutes,
-                    "auto_start_enabled": config.auto_start_enabled,
-                    "comfyui_url": config.comfyui_browser_url,
-                }
-            }
+            "timestamp": status_snapshot.collected_at,
+            "data": status
         })
 
         # Keep connection alive and handle incoming messages
@@ -132,7 +245,9 @@ async def websocket_endpoint(websocket: WebSocket):
 
                 # Handle client messages (e.g., ping)
                 if data.get("type") == "ping":
-                    await websocket.send_json({"type": "pong"})
+                    await manager.send(websocket, {"type": "pong"})
+                elif data.get("type") == "hello" and data.get("mode") == "delta":
+                    await manager.enable_delta(websocket)
 
             except WebSocketDisconnect:
                 break
@@ -146,6 +261,8 @@ async def websocket_endpoint(websocket: WebSocket):
 
 async def notify_state_change(message: str):
     """Send a state change notification to all clients."""
+    # Make sure the status following a state change is always pushed
+    manager.force_next_broadcast()
     await manager.broadcast({
         "type": "state_change",
         "timestamp": datetime.now().isoformat(),
@@ -0,0 +1,169 @@
+"""
+Combined status snapshot shared by the REST API and WebSocket broadcasts.
+A single producer task collects the status while anyone is subscribed and
+publishes it to every consumer, so readers never query Docker and ComfyUI
+themselves.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+from .config import get_config
+from .docker_manager import docker_manager, ContainerState
+from .comfyui_client import comfyui_client, QueueStatus
+from .idle_monitor import idle_monitor
+
+logger = logging.getLogger(__name__)
+
+# Maximum age of a snapshot that may be served instead of a fresh fetch
+SNAPSHOT_MAX_AGE_SECONDS = 1.5
+
+# Seconds between collections while there are subscribers
+PUBLISH_INTERVAL_SECONDS = 2.0
+
+
+async def _get_queue_status() -> QueueStatus:
+    """Poll the ComfyUI queue unless the container is known to be down."""
+    if docker_manager.state in (ContainerState.STOPPED, ContainerState.NOT_FOUND):
+        # Nothing would answer; skip the doomed connection attempt
+        return QueueStatus(connected=False, error="Container not running")
+    return await comfyui_client.get_queue_status()
+
+
+async def build_status() -> Dict[str, Any]:
+    """Collect container, queue, idle and config status."""
+    # The Docker inspection and the ComfyUI queue poll are independent
+    # round trips, so overlap them
+    container_status, queue_status = await asyncio.gather(
+        docker_manager.get_status_async(),
+        _get_queue_status()
+    )
+    idle_info = idle_monitor.get_idle_info()
+    config = get_config()
+
+    return {
+        "container": container_status,
+        "queue": queue_status.to_dict(),
+        "idle": idle_info,
+        "config": {
+            "idle_timeout_minutes": config.idle_timeout_minutes,
+            "poll_interval_seconds": config.poll_interval_seconds,
+            "auto_start_enabled": config.auto_start_enabled,
+            "container_name": config.container_name,
+            "comfyui_url": config.comfyui_browser_url,
+        }
+    }
+
+
+class StatusSnapshot:
+    """Holds the most recently collected status and publishes updates."""
+
+    def __init__(self):
+        self._data: Optional[Dict[str, Any]] = None
+        self._updated_at: float = 0.0
+        self._collected_at: Optional[str] = None
+        self._refresh_lock = asyncio.Lock()
+        # Replaced on every update; waiters hold the previous one
+        self._updated = asyncio.Event()
+        self._subscribers: int = 0
+        # Set while there are subscribers, gating the producer
+        self._demand = asyncio.Event()
+        # Set on container state changes to collect ahead of schedule
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        docker_manager.add_state_listener(self._on_state_change)
+
+    def _on_state_change(self, state: ContainerState) -> None:
+        """Publish a container transition right away instead of on the next tick."""
+        self._wake.set()
+
+    def update(self, data: Dict[str, Any]) -> None:
+        """Store a freshly collected status and wake waiting consumers."""
+        self._data = data
+        self._updated_at = time.monotonic()
+        # Formatted once per collection and shared by every message about it
+        self._collected_at = datetime.now().isoformat()
+        updated, self._updated = self._updated, asyncio.Event()
+        updated.set()
+
+    async def wait_for_update(self) -> Dict[str, Any]:
+        """Wait for the next published status."""
+        await self._updated.wait()
+        return self._data
+
+    @property
+    def collected_at(self) -> Optional[str]:
+        """ISO timestamp of the current snapshot's collection."""
+        return self._collected_at
+
+    def subscribe(self) -> None:
+        """Register interest in periodic updates."""
+        self._subscribers += 1
+        self._demand.set()
+
+    def unsubscribe(self) -> None:
+        """Withdraw interest in periodic updates."""
+        self._subscribers = max(0, self._subscribers - 1)
+        if self._subscribers == 0:
+            self._demand.clear()
+
+    async def _produce(self) -> None:
+        """Collect and publish the status while anyone is subscribed."""
+        while True:
+            await self._demand.wait()
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Error collecting status: {e}")
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), PUBLISH_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def start(self) -> None:
+        """Start the producer task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._produce())
+
+    def stop(self) -> None:
+        """Stop the producer task."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def get(self, max_age: float = SNAPSHOT_MAX_AGE_SECONDS) -> Optional[Dict[str, Any]]:
+        """Get a copy of the snapshot if it is younger than max_age seconds."""
+        if self._data is None or time.monotonic() - self._updated_at > max_age:
+            return None
+        return dict(self._data)
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Collect a fresh status and store it."""
+        data = await build_status()
+        self.update(data)
+        return data
+
+    async def get_or_refresh(self, max_age: float = SNAPSHOT_MAX_AGE_SECONDS) -> Dict[str, Any]:
+        """Get the snapshot, collecting a new one if it is older than max_age.
+
+        Concurrent callers that find it stale share a single collection.
+        """
+        data = self.get(max_age)
+        if data is not None:
+            return data
+
+        async with self._refresh_lock:
+            # Another caller may have refreshed while we waited
+            data = self.get(max_age)
+            if data is not None:
+                return data
+            return await self.refresh()
+
+
+# Global status snapshot instance
+status_snapshot = StatusSnapshot()
@@ -42,7 +42,11 @@ export async function updateConfig(config) {
   });
   if (!response.ok) {
     const error = await response.json();
-    throw new Error(error.detail || 'Failed to update config');
+    // Range violations come back as a list of validation errors
+    const detail = Array.isArray(error.detail)
+      ? error.detail.map((item) => item.msg).join('; ')
+      : error.detail;
+    throw new Error(detail || 'Failed to update config');
   }
   return response.json();
 }
@@ -13,7 +13,7 @@ export function useWebSocket(url) {
   const connect = useCallback(() => {
     // Build WebSocket URL
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-    const wsUrl = url || `${protocol}//${window.location.host}/ws`;
+    const wsUrl = url || `${protocol}//${window.location.host}/manager/ws`;
 
     try {
       const ws = new WebSocket(wsUrl);
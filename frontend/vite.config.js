@@ -12,7 +12,7 @@ export default defineConfig({
         target: 'http://localhost:8080',
         changeOrigin: true,
       },
-      '/ws': {
+      '/manager/ws': {
         target: 'ws://localhost:8080',
         ws: true,
       },